@@ -1,37 +1,260 @@
 import apsw
-from typing import Any, Dict, List, Optional, Tuple
-from datetime import datetime
+import json
+import math
+import re
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from .encoding import encode_value, decode_value
+from .encoding import encode_value, decode_value, decode_many, _INT64_MIN, _INT64_MAX
+
+# Statement text is kept in module constants so every call passes the identical string,
+# which keeps apsw's per-connection statement cache hitting.
+_SQL_GET = "SELECT value, expires_at FROM FlashDB WHERE key = ? AND (expires_at IS NULL OR expires_at > ?) LIMIT 1"
+# An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete skips the count trigger
+_SQL_SET = (
+    "INSERT INTO FlashDB (key, value, expires_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+)
+_SQL_UPDATE = "UPDATE FlashDB SET value = ? WHERE key = ?"
+# Adds to a live integer, or starts a missing or expired key from the amount; returns no row for other
+# values and for sums outside int64, which SQLite would otherwise silently turn into a REAL
+_SQL_INCR = (
+    "INSERT INTO FlashDB (key, value, expires_at) VALUES (?1, ?2, NULL) "
+    "ON CONFLICT(key) DO UPDATE SET "
+    "value = CASE WHEN expires_at <= ?3 THEN excluded.value ELSE value + excluded.value END, "
+    "expires_at = CASE WHEN expires_at <= ?3 THEN NULL ELSE expires_at END "
+    "WHERE expires_at <= ?3 OR (typeof(value) = 'integer' AND CASE WHEN ?2 >= 0 "
+    "THEN value <= 9223372036854775807 - ?2 ELSE value >= -9223372036854775808 - ?2 END) "
+    "RETURNING value"
+)
+_SQL_DEL = "DELETE FROM FlashDB WHERE key = ?"
+_SQL_POP = "DELETE FROM FlashDB WHERE key = ? AND (expires_at IS NULL OR expires_at > ?) RETURNING value"
+_SQL_EXISTS = "SELECT EXISTS(SELECT 1 FROM FlashDB WHERE key = ? AND (expires_at IS NULL OR expires_at > ?))"
+# Key lists are bound as one array parameter, expanded by carray or json_each (see _bind_keys)
+_SQL_GET_MANY = (
+    "SELECT FlashDB.key, FlashDB.value FROM {} AS k JOIN FlashDB ON FlashDB.key = CAST(k.value AS TEXT) "
+    "WHERE FlashDB.expires_at IS NULL OR FlashDB.expires_at > ?"
+)
+_SQL_GET_MANY_CARRAY, _SQL_GET_MANY_JSON = _SQL_GET_MANY.format("carray(?)"), _SQL_GET_MANY.format("json_each(?)")
+_SQL_DEL_MANY = "DELETE FROM FlashDB WHERE key IN (SELECT CAST(value AS TEXT) FROM {})"
+_SQL_DEL_MANY_CARRAY, _SQL_DEL_MANY_JSON = _SQL_DEL_MANY.format("carray(?)"), _SQL_DEL_MANY.format("json_each(?)")
+_SQL_RENAME = "UPDATE FlashDB SET key = ? WHERE key = ?"
+_SQL_GET_EXPIRE = "SELECT expires_at FROM FlashDB WHERE key = ? LIMIT 1"
+_SQL_SET_EXPIRE = "UPDATE FlashDB SET expires_at = ? WHERE key = ?"
+# Key listings bound the primary key to the range the pattern's literal prefix allows (see _like_bounds)
+_SQL_KEYS = "SELECT key FROM FlashDB WHERE key >= ? AND key < ? AND key LIKE ?"
+_SQL_PAGE_FIRST = "SELECT key FROM FlashDB WHERE key >= ? AND key < ? AND key LIKE ? ORDER BY key LIMIT ?"
+_SQL_PAGE_AFTER = "SELECT key FROM FlashDB WHERE key > ? AND key < ? AND key LIKE ? ORDER BY key LIMIT ?"
+_SQL_PAGE_OFFSET = "SELECT key FROM FlashDB WHERE key >= ? AND key < ? AND key LIKE ? ORDER BY key LIMIT ? OFFSET ?"
+_SQL_COUNT = "SELECT n FROM FlashMeta WHERE id = 0"
+_SQL_COUNT_EXPIRED = "SELECT COUNT(*) FROM FlashDB INDEXED BY idx_expires_at WHERE expires_at IS NOT NULL AND expires_at <= ?"
+_SQL_CLEANUP = "DELETE FROM FlashDB INDEXED BY idx_expires_at WHERE expires_at IS NOT NULL AND expires_at <= ?"
+
+# DELETE ... RETURNING needs SQLite 3.35; older libraries pop with a SELECT and DELETE instead
+_HAS_RETURNING = tuple(map(int, apsw.sqlitelibversion().split("."))) >= (3, 35)
+
+_HAS_CARRAY = hasattr(apsw, "carray")
+
+_MISSING = object()
+
+_LIKE_WILDCARD = re.compile(r"[%_]")
+
+def _bind_keys(keys: Iterable[str], carray_query: str, json_query: str) -> Tuple[str, Any]:
+    """
+    Binds a list of keys as a single array parameter.
+
+    apsw builds with the carray extension hand SQLite the strings directly. Other builds, and
+    key lists that are not all str (which carray rejects), travel as a JSON array for json_each.
+    Both queries cast the keys to TEXT, as SQLite does for a single-key lookup.
+
+    Args:
+        keys: The keys to bind.
+        carray_query: The query reading the keys from carray(?).
+        json_query: The same query reading the keys from json_each(?).
+
+    Returns:
+        The query to run and the parameter to bind to it.
+    """
+    keys = tuple(keys)
+    if _HAS_CARRAY:
+        try:
+            return carray_query, apsw.carray(keys)
+        except TypeError:
+            pass
+    return json_query, json.dumps(keys)
+
+def _expires_at(now: int, ttl: float) -> int:
+    """
+    Computes the expiration timestamp for a TTL.
+
+    Rounds up, so a fractional TTL such as 0.5 keeps the key for at least that long instead of
+    truncating to an expiration that has already passed.
+
+    Args:
+        now: Current UTC time as a Unix timestamp.
+        ttl: Time-to-live in seconds.
+
+    Returns:
+        The Unix timestamp at which the key expires.
+    """
+    return math.ceil(now + ttl)
+
+def _is_private(db_path: str) -> bool:
+    """
+    Tells whether a path names a database only the opening connection can see.
+
+    ":memory:" is an in-memory database and "" a temporary on-disk one. Either way, every other
+    connection opened with the same path gets a separate, empty database of its own.
+
+    Args:
+        db_path: File path to the SQLite database.
+
+    Returns:
+        True if no second connection can share the database.
+    """
+    return db_path in ("", ":memory:")
+
+def _like_bounds(pattern: str) -> Tuple[str, Union[str, bytes]]:
+    """
+    Computes the key range a LIKE pattern can match, so listings can range-scan the primary key.
+
+    Args:
+        pattern: Case-sensitive SQL LIKE pattern.
+
+    Returns:
+        An inclusive lower and exclusive upper bound. The upper bound is an empty BLOB when the
+        pattern has no literal prefix, since SQLite orders every TEXT value below any BLOB.
+    """
+    wildcard = _LIKE_WILDCARD.search(pattern)
+    prefix = pattern[:wildcard.start()] if wildcard else pattern
+    if not prefix or ord(prefix[-1]) == 0x10FFFF:
+        return prefix, b""
+    successor = ord(prefix[-1]) + 1
+    if 0xD800 <= successor <= 0xDFFF:  # Skip the surrogate block, which cannot be encoded
+        successor = 0xE000
+    return prefix, prefix[:-1] + chr(successor)
 
 class Client:
     """
     FlashSQL is a high-performance key-value store built on SQLite with expiration support.
     """
 
-    def __init__(self, db_path: str) -> None:
+    CHECKPOINT_INTERVAL = 2  # Seconds between background WAL checkpoints
+    CLOSE_CHECKPOINT_TIMEOUT = 100  # Milliseconds close() waits for other connections before a partial checkpoint
+    ANALYZE_BATCH = 10000  # set_many batches at least this large refresh the planner statistics
+    WRITE_FLUSH_INTERVAL = 0.01  # Seconds a buffered write may wait before the next buffered write flushes it
+    PAGE_SIZE = 16384
+
+    def __init__(self, db_path: str, exclusive: bool = False, num_readers: int = 3, cache_size: int = 0,
+                 cleanup_interval: Optional[int] = 60, write_batch: int = 0,
+                 background_writes: bool = False) -> None:
         """
         Initializes the FlashSQL instance.
 
         Args:
-            db_path: File path to the SQLite database. Use ":memory:" for an in-memory database.
+            db_path: File path to the SQLite database. Use ":memory:" for an in-memory database, or
+                    "" for a private temporary one.
+            exclusive: Hold an exclusive lock on the database file for the lifetime of the client.
+                    Faster for a single process, but no other connection can open the database.
+            num_readers: Number of read-only connections opened up front for reads. Each read checks
+                    one out, and more are opened if more reads than that run at once. Use 0 to
+                    serve reads from the main connection, as in-memory, temporary ("") and
+                    exclusive databases do.
+            cache_size: Maximum number of recently read keys kept in memory so repeated `get` and
+                    `exists` calls skip SQLite. Disabled (0) by default, since writes made by
+                    other processes are not seen by cached keys.
+            cleanup_interval: Minimum seconds between the automatic cleanups run from `set` and
+                    `set_many`. Use None to only clean up when `cleanup` is called explicitly.
+            write_batch: Buffer up to this many `set` and `delete` calls in memory and write them in
+                    one transaction. The buffer is also flushed by any other operation and by any
+                    buffered write made `WRITE_FLUSH_INTERVAL` seconds after the oldest one. This
+                    client sees buffered writes immediately, but other processes only see them
+                    once flushed, and they are lost if the process dies before `flush_writes` or
+                    `close`. Disabled (0) by default.
+            background_writes: Commit the `write_batch` buffer from a background thread with its
+                    own connection, so `set` and `delete` never wait on a commit, a busy lock or a
+                    checkpoint. Other operations still flush on the calling thread first. Ignored
+                    without `write_batch` and for in-memory, temporary ("") and exclusive databases.
         """
-        self.conn = apsw.Connection(db_path)
+        self._exclusive = exclusive
+        self.conn = apsw.Connection(db_path, statementcachesize=512)
         self.cursor = self.conn.cursor()
+        self._get_cursor = self.conn.cursor()
+        self._set_cursor = self.conn.cursor()
+        self._del_cursor = self.conn.cursor()
+        self._exists_cursor = self.conn.cursor()
+        self._expire_cursor = self.conn.cursor()
+        self._cleanup_interval = cleanup_interval
+        self._last_cleanup = 0
+        self._time_cache = (0.0, 0)  # (monotonic refresh deadline, cached Unix time)
+        self._closed = threading.Event()
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[Any, Optional[int]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        self._write_batch = write_batch
+        self._pending: Dict[str, Optional[Tuple[Any, Optional[int]]]] = {}  # key -> (stored value, expires_at), None to delete
+        self._inflight: Dict[str, Optional[Tuple[Any, Optional[int]]]] = {}  # batch being committed, still visible to reads
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # held for a whole flush, so batches commit in order
+        self._pending_deadline = 0.0  # monotonic time by which the buffer should be flushed
         self._setup()
 
+        if _is_private(db_path) or exclusive:
+            num_readers = 0
+        self._db_path = db_path
+        self._readers = [self._open_reader(db_path) for _ in range(num_readers)]
+        self._idle_readers = list(self._readers)  # stack of readers not checked out; list ops are atomic
+
+        # An exclusive database cannot be opened by the checkpointer, so it checkpoints inline instead
+        self._checkpointer = None
+        if not _is_private(db_path) and not exclusive:
+            self._checkpointer = threading.Thread(target=self._checkpoint_loop, args=(db_path,), daemon=True)
+            self._checkpointer.start()
+
+        self._writer = None
+        self._wake_writer = threading.Event()
+        self._writer_error: Optional[Exception] = None  # last commit failure, raised to the next buffered write
+        if write_batch and background_writes and not _is_private(db_path) and not exclusive:
+            self._writer = threading.Thread(target=self._writer_loop, args=(db_path,), daemon=True)
+            self._writer.start()
+
     def _setup(self) -> None:
         """
         Sets up the database schema and PRAGMA settings for optimal performance.
         """
+        self.conn.execute("PRAGMA busy_timeout=10000")
+
+        # page_size and auto_vacuum only apply to a database with no content yet, so they must come first.
+        # Existing databases with different settings are rebuilt once to adopt them. A WAL database
+        # only leaves WAL mode when no other connection has it open; otherwise, or if the rebuild
+        # cannot get its lock, the database is used as it is and a later open tries again.
+        self.conn.execute(f"PRAGMA page_size={self.PAGE_SIZE}")
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        if (self.conn.execute("PRAGMA page_size").fetchall()[0][0] != self.PAGE_SIZE
+                or self.conn.execute("PRAGMA auto_vacuum").fetchall()[0][0] != 2):
+            try:
+                if self.conn.execute("PRAGMA journal_mode=DELETE").fetchall()[0][0].lower() == "delete":
+                    self.conn.execute(f"PRAGMA page_size={self.PAGE_SIZE}")
+                    self.conn.execute("VACUUM")
+            except apsw.BusyError:
+                pass
+
         self.conn.execute("PRAGMA temp_store=MEMORY")
         self.conn.execute("PRAGMA cache_size=-128000") 
         self.conn.execute("PRAGMA mmap_size=5000000000")  # 5GB memory map
-        self.conn.execute("PRAGMA busy_timeout=10000")  
-        self.conn.execute("PRAGMA page_size=8192")
-        self.conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+        if self._exclusive:
+            self.conn.execute("PRAGMA locking_mode=EXCLUSIVE")
         self.conn.execute("PRAGMA foreign_keys=OFF")
+        self.conn.execute("PRAGMA case_sensitive_like=ON")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA journal_size_limit=67108864")  # Truncate the WAL back to 64MB after checkpoints
 
+        self._migrate()
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS FlashDB (
                 key TEXT PRIMARY KEY,
@@ -41,20 +264,382 @@ class Client:
         """)
         self.conn.execute("CREATE INDEX IF NOT EXISTS idx_expires_at ON FlashDB (expires_at) WHERE expires_at IS NOT NULL;")
 
-        self.conn.execute("PRAGMA optimize")
-        self.conn.execute("ANALYZE")
+        # Live row count maintained by triggers, so count() does not have to walk the whole table
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS FlashMeta (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    n INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+            # Seeded once, so later opens neither count the whole table nor take the write lock
+            if not self.conn.execute("SELECT 1 FROM FlashMeta WHERE id = 0").fetchall():
+                self.conn.execute(
+                    "INSERT INTO FlashMeta (id, n) SELECT 0, (SELECT COUNT(*) FROM FlashDB) "
+                    "WHERE NOT EXISTS (SELECT 1 FROM FlashMeta WHERE id = 0)"
+                )
+            self.conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS FlashDB_count_insert AFTER INSERT ON FlashDB
+                BEGIN UPDATE FlashMeta SET n = n + 1 WHERE id = 0; END;
+            """)
+            self.conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS FlashDB_count_delete AFTER DELETE ON FlashDB
+                BEGIN UPDATE FlashMeta SET n = n - 1 WHERE id = 0; END;
+            """)
+
+        # Approximate statistics are enough for the planner and keep ANALYZE cheap on large tables.
+        # Stale statistics are refreshed at open (0x10002 also covers tables never analyzed) and on close.
+        self.conn.execute("PRAGMA analysis_limit=1000")
+        self.conn.execute("PRAGMA optimize=0x10002")
         self.conn.execute("PRAGMA cache_spill=FALSE")  
-        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL") 
-        self.conn.execute("PRAGMA wal_autocheckpoint=1000")  
+        if not self._exclusive:
+            self.conn.execute("PRAGMA wal_autocheckpoint=0")  # The background checkpointer takes over
+
+    def _open_reader(self, db_path: str) -> apsw.Connection:
+        """
+        Opens a read-only connection to the database for the reader pool.
+
+        Args:
+            db_path: File path to the SQLite database.
+
+        Returns:
+            The configured reader connection.
+        """
+        reader = apsw.Connection(db_path, statementcachesize=512)
+        reader.execute("PRAGMA query_only=1")
+        reader.execute("PRAGMA temp_store=MEMORY")
+        reader.execute("PRAGMA cache_size=-32000")
+        reader.execute("PRAGMA mmap_size=5000000000")
+        reader.execute("PRAGMA busy_timeout=10000")
+        reader.execute("PRAGMA case_sensitive_like=ON")
+        return reader
+
+    def _acquire_reader(self) -> Optional[apsw.Connection]:
+        """
+        Checks out a reader connection for the caller's exclusive use.
+
+        apsw raises rather than waits when a connection is busy in another thread, so a reader
+        is never shared. When every reader is checked out, another one is opened and joins the pool.
+
+        Returns:
+            The reader to run the read on, to be handed back with `_release_reader`, or None when
+            the read must use the main connection: there is no pool, or a transaction is open and
+            its uncommitted writes must stay visible.
+        """
+        if not self._readers or self.conn.in_transaction:
+            return None
+        try:
+            return self._idle_readers.pop()
+        except IndexError:
+            reader = self._open_reader(self._db_path)
+            self._readers.append(reader)
+            return reader
+
+    def _release_reader(self, reader: Optional[apsw.Connection]) -> None:
+        """
+        Returns a reader checked out with `_acquire_reader` to the pool.
+
+        Args:
+            reader: The reader, or None if the read used the main connection.
+        """
+        if reader is not None:
+            self._idle_readers.append(reader)
+
+    def _read_all(self, cursor: apsw.Cursor, query: str, params: Tuple = ()) -> List[Tuple]:
+        """
+        Runs a read on a checked-out reader and fetches every row.
+
+        Args:
+            cursor: The main-connection cursor to use when the pool cannot serve the read.
+            query: The SQL query to execute.
+            params: Parameters for the SQL query.
+
+        Returns:
+            The result rows.
+        """
+        reader = self._acquire_reader()
+        try:
+            return (cursor if reader is None else reader.cursor()).execute(query, params).fetchall()
+        finally:
+            self._release_reader(reader)
+
+    def _read_keys(self, query: str, params: Tuple) -> List[str]:
+        """
+        Runs a key listing on a checked-out reader, streaming the keys off the cursor.
+
+        Args:
+            query: The SQL query to execute, selecting only the key column.
+            params: Parameters for the SQL query.
+
+        Returns:
+            The keys, in the order the query returns them.
+        """
+        reader = self._acquire_reader()
+        try:
+            return [row[0] for row in (self.cursor if reader is None else reader.cursor()).execute(query, params)]
+        finally:
+            self._release_reader(reader)
+
+    def _migrate(self) -> None:
+        """
+        Upgrades databases created by older releases.
+
+        Drops the redundant idx_key index (the WITHOUT ROWID primary key already orders rows by key)
+        and converts ISO 8601 text expirations to integer Unix timestamps.
+        """
+        self.conn.execute("DROP INDEX IF EXISTS idx_key")
+        columns = {row[1]: row[2] for row in self.conn.execute("PRAGMA table_info(FlashDB)")}
+        if columns.get("expires_at", "INTEGER").upper() == "INTEGER":
+            return
+
+        with self.conn:
+            self.conn.execute("DROP INDEX IF EXISTS idx_expires_at")
+            self.conn.execute("ALTER TABLE FlashDB RENAME TO FlashDB_old")
+            self.conn.execute("""
+                CREATE TABLE FlashDB (
+                    key TEXT PRIMARY KEY,
+                    value BLOB,
+                    expires_at INTEGER
+                ) WITHOUT ROWID;
+            """)
+            self.conn.execute("""
+                INSERT INTO FlashDB (key, value, expires_at)
+                SELECT key, value, CAST(strftime('%s', expires_at) AS INTEGER) FROM FlashDB_old
+            """)
+            self.conn.execute("DROP TABLE FlashDB_old")
+
+    def _checkpoint_loop(self, db_path: str) -> None:
+        """
+        Periodically copies the WAL back into the database without blocking readers or writers.
+
+        Runs on a daemon thread so that writes never pay for checkpointing themselves. The thread
+        uses its own connection, since apsw raises rather than waits when a connection is already
+        busy in another thread.
+
+        Args:
+            db_path: File path to the SQLite database.
+        """
+        conn = apsw.Connection(db_path)
+        try:
+            while not self._closed.wait(self.CHECKPOINT_INTERVAL):
+                try:
+                    conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                except (apsw.BusyError, apsw.LockedError):
+                    pass
+        finally:
+            conn.close()
+
+    def _writer_loop(self, db_path: str) -> None:
+        """
+        Commits the write buffer once it fills up or its oldest write is `WRITE_FLUSH_INTERVAL`
+        seconds old, and sleeps while the buffer is empty.
+
+        Runs on a daemon thread with its own connection, since apsw connections cannot be used
+        from two threads at once. A failed commit leaves the batch buffered for a retry, and
+        anything other than a busy database is handed to the next buffered write to raise.
+
+        Args:
+            db_path: File path to the SQLite database.
+        """
+        conn = apsw.Connection(db_path, statementcachesize=512)
+        conn.execute("PRAGMA busy_timeout=10000")
+        conn.execute("PRAGMA journal_size_limit=67108864")
+        conn.execute("PRAGMA wal_autocheckpoint=0")  # The background checkpointer takes over
+        try:
+            while not self._closed.is_set():
+                # Woken by the first write into an empty buffer, a full buffer, or close
+                timeout = self._pending_deadline - time.monotonic() if self._pending else None
+                if timeout is None or timeout > 0:
+                    self._wake_writer.wait(timeout)
+                    self._wake_writer.clear()
+                if (self._closed.is_set() or len(self._pending) < self._write_batch
+                        and time.monotonic() < self._pending_deadline):
+                    continue
+                try:
+                    with self._flush_lock:
+                        self._write_pending(conn)
+                except Exception as error:
+                    if not isinstance(error, (apsw.BusyError, apsw.LockedError)):
+                        self._writer_error = error
+                    self._closed.wait(self.WRITE_FLUSH_INTERVAL)
+        finally:
+            conn.close()
+
+    def _write_pending(self, conn: apsw.Connection) -> None:
+        """
+        Commits the write buffer in one transaction on the given connection.
+
+        The batch stays readable as `_inflight` until it is committed, and goes back into the
+        buffer if the commit fails. Callers must hold `_flush_lock`.
+
+        Args:
+            conn: The connection to write with.
+        """
+        with self._pending_lock:
+            if not self._pending:
+                return
+            batch = self._inflight = self._pending
+            self._pending = {}
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.executemany(_SQL_SET, (
+                    (key, entry[0], entry[1]) for key, entry in batch.items() if entry is not None
+                ))
+                cursor.executemany(_SQL_DEL, ((key,) for key, entry in batch.items() if entry is None))
+        except BaseException:
+            with self._pending_lock:
+                batch.update(self._pending)  # writes buffered during the attempt are newer
+                self._pending = batch
+            raise
+        finally:
+            self._inflight = {}
+
+    def _buffered_entry(self, key: str) -> Any:
+        """
+        Looks up a key in the write buffer, including a batch that is being committed.
+
+        Args:
+            key: The key to look up.
+
+        Returns:
+            The buffered (stored value, expires_at) row, None for a buffered delete, or `_MISSING`
+            if the key has no buffered write.
+        """
+        # _write_pending publishes _inflight before swapping out _pending, so checking in this
+        # order never misses a batch that is on its way to the database
+        entry = self._pending.get(key, _MISSING)
+        return self._inflight.get(key, _MISSING) if entry is _MISSING else entry
+
+    def _buffer_write(self, key: str, entry: Optional[Tuple[Any, Optional[int]]]) -> bool:
+        """
+        Queues a write in the write buffer, flushing it once it holds `write_batch` keys or its
+        oldest write is `WRITE_FLUSH_INTERVAL` seconds old. With a background writer, the
+        writer is woken instead of flushing on the calling thread.
+
+        Args:
+            key: The key being written.
+            entry: The (stored value, expires_at) row to store, or None to delete the key.
+
+        Returns:
+            True if the write was buffered, False if the caller must write directly: a transaction
+            is open, or the key is not a str. Such keys are left for SQLite to convert or reject
+            at the call site, since one that failed to bind would otherwise fail every flush.
+
+        Raises:
+            Exception: The error a background commit last failed with, if any. The write is not
+                    buffered, and the failed batch stays buffered for the next attempt.
+        """
+        if type(key) is not str:
+            self.flush_writes()  # keep earlier buffered writes ordered before the direct one
+            return False
+        if self._writer_error is not None:
+            error, self._writer_error = self._writer_error, None
+            raise error
+        with self._pending_lock:
+            if self.conn.in_transaction:
+                return False
+            first = not self._pending
+            if first:
+                self._pending_deadline = time.monotonic() + self.WRITE_FLUSH_INTERVAL
+            self._pending[key] = entry
+            full = len(self._pending) >= self._write_batch or time.monotonic() >= self._pending_deadline
+        if self._writer is not None and self._writer.is_alive():
+            if first or full:
+                self._wake_writer.set()
+        elif full:
+            self.flush_writes()
+        self._invalidate((key,))
+        return True
 
     def _current_time(self) -> int:
         """
         Gets the current UTC time as a Unix timestamp.
 
+        The value is refreshed at most every half second, so tight loops of reads do not pay for
+        a clock read each time. Expirations have one-second granularity, so the staleness is
+        well within TTL semantics.
+
         Returns:
             Current UTC time as a Unix timestamp.
         """
-        return int(datetime.utcnow().timestamp())
+        cached = self._time_cache
+        tick = time.monotonic()
+        if tick >= cached[0]:
+            cached = self._time_cache = (tick + 0.5, int(time.time()))
+        return cached[1]
+
+    def _cache_lookup(self, key: str, now: int) -> Optional[Tuple[Any, Optional[int]]]:
+        """
+        Looks up a live cache entry for a key.
+
+        Args:
+            key: The key to look up.
+            now: Current UTC time as a Unix timestamp.
+
+        Returns:
+            The cached (stored value, expires_at) row, or None on a miss or if the entry has expired.
+        """
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= now):
+                return None
+            self._cache.move_to_end(key)
+            return entry
+
+    def _cache_store(self, key: str, entry: Tuple[Any, Optional[int]], generation: int) -> None:
+        """
+        Caches a row read from the database, evicting the least recently used entry if full.
+
+        Nothing is stored inside a transaction (the row may be rolled back) or if a write
+        invalidated the cache after the row was read.
+
+        Args:
+            key: The key that was read.
+            entry: The (stored value, expires_at) row.
+            generation: The cache generation observed before the row was read.
+        """
+        if self.conn.in_transaction:
+            return
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                return
+            self._cache[key] = entry
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _invalidate(self, keys: Iterable[str]) -> None:
+        """
+        Drops keys from the read cache after they are written.
+
+        Args:
+            keys: The keys that were modified.
+        """
+        if not self._cache_size:
+            return
+        with self._cache_lock:
+            self._cache_generation += 1
+            if self._cache:
+                for key in keys:
+                    self._cache.pop(key, None)
+
+    def _clear_cache(self) -> None:
+        """
+        Drops every entry from the read cache, for writes whose affected keys are unknown.
+        """
+        with self._cache_lock:
+            self._cache_generation += 1
+            self._cache.clear()
+
+    def _maybe_cleanup(self, now: int) -> None:
+        """
+        Runs cleanup if automatic cleanup is enabled and the cleanup interval has passed since the last one.
+
+        Args:
+            now: Current UTC time as a Unix timestamp.
+        """
+        if self._cleanup_interval is not None and now - self._last_cleanup >= self._cleanup_interval:
+            self.cleanup()
 
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """
@@ -65,11 +650,14 @@ class Client:
             value: The value to store, which should be serializable.
             ttl: Time-to-live in seconds. If not provided, the key never expires.
         """
-        expires_at = (self._current_time() + ttl) if ttl else None
-        self.cursor.execute("""
-            INSERT OR REPLACE INTO FlashDB (key, value, expires_at) 
-            VALUES (?, ?, ?)
-        """, (key, encode_value(value), expires_at))
+        now = self._current_time()
+        self._maybe_cleanup(now)
+        expires_at = _expires_at(now, ttl) if ttl else None
+        stored = encode_value(value)
+        if self._write_batch and self._buffer_write(key, (stored, expires_at)):
+            return
+        self._set_cursor.execute(_SQL_SET, (key, stored, expires_at))
+        self._invalidate((key,))
 
     def set_many(self, items: Dict[str, Tuple[Any, Optional[int]]]) -> None:
         """
@@ -78,16 +666,37 @@ class Client:
         Args:
             items: Dictionary where keys are the key names and values are tuples containing the value and optional TTL.
         """
+        self.flush_writes()
         now = self._current_time()
-        sql = """
-            INSERT OR REPLACE INTO FlashDB (key, value, expires_at) 
-            VALUES (?, ?, ?)
-        """
-        values = [
-            (key, encode_value(value), (now + ttl) if ttl else None)
+        self._maybe_cleanup(now)
+        values = (
+            (key, encode_value(value), _expires_at(now, ttl) if ttl else None)
             for key, (value, ttl) in items.items()
-        ]
-        self.cursor.executemany(sql, values)
+        )
+        with self.conn:
+            self._set_cursor.executemany(_SQL_SET, values)
+        self._invalidate(items)
+        if len(items) >= self.ANALYZE_BATCH:
+            self.analyze()
+
+    def set_many_bytes(self, items: Iterable[Tuple[str, bytes, Optional[int]]], now: Optional[int] = None) -> None:
+        """
+        Bulk-loads values that are already in FlashSQL's stored encoding, skipping encode_value.
+
+        Intended for imports, such as rows copied from another FlashSQL database's value column
+        or produced by encode_value ahead of time. Rows are streamed in a single transaction.
+
+        Args:
+            items: Iterable of (key, encoded value, TTL) tuples. A TTL of None means the key never expires.
+            now: Unix timestamp that TTLs are relative to. Defaults to the current time.
+        """
+        self.flush_writes()
+        if now is None:
+            now = self._current_time()
+        values = ((key, value, _expires_at(now, ttl) if ttl else None) for key, value, ttl in items)
+        with self.conn:
+            self._set_cursor.executemany(_SQL_SET, values)
+        self._clear_cache()
 
     def get(self, key: str) -> Optional[Any]:
         """
@@ -100,17 +709,29 @@ class Client:
             The value associated with the key, or None if the key does not exist or has expired.
         """
         now = self._current_time()
-        self.cursor.execute("""
-            SELECT value FROM FlashDB 
-            WHERE key = ? AND (expires_at IS NULL OR expires_at > ?) 
-            LIMIT 1
-        """, (key, now))
-        result = self.cursor.fetchone()
-        return decode_value(result[0]) if result else None
+        if self._pending or self._inflight:
+            entry = self._buffered_entry(key)
+            if entry is not _MISSING:
+                return None if entry is None or (entry[1] is not None and entry[1] <= now) else decode_value(entry[0])
+        if self._cache_size:
+            entry = self._cache_lookup(key, now)
+            if entry is not None:
+                return decode_value(entry[0])
+            generation = self._cache_generation
+
+        rows = self._read_all(self._get_cursor, _SQL_GET, (key, now))
+        if not rows:
+            return None
+        if self._cache_size:
+            self._cache_store(key, rows[0], generation)
+        return decode_value(rows[0][0])
 
     def get_many(self, keys: List[str]) -> Dict[str, Optional[Any]]:
         """
-        Retrieves values for multiple keys efficiently using batching and indexing.
+        Retrieves values for multiple keys in a single query.
+
+        The keys are bound as one array parameter, so any number of keys can be looked up
+        without hitting SQLite's bound-variable limit.
 
         Args:
             keys: List of keys to look up.
@@ -118,23 +739,16 @@ class Client:
         Returns:
             A dictionary where keys are the key names and values are the associated values or None if not found or expired.
         """
-        now = self._current_time()
-        batch_size = 1000
-        result = {}
-        
-        for i in range(0, len(keys), batch_size):
-            batch = keys[i:i + batch_size]
-            placeholders = ','.join('?' for _ in batch)  
-            
-            sql = f"""
-                SELECT key, value FROM FlashDB 
-                WHERE key IN ({placeholders}) AND (expires_at IS NULL OR expires_at > ?)
-            """
-            
-            self.cursor.execute(sql, (*batch, now))
-            result.update({key: decode_value(value) for key, value in self.cursor.fetchall()})
-        
-        return result
+        self.flush_writes()
+        if not keys:
+            return {}
+        reader = self._acquire_reader()
+        try:
+            cursor = self._get_cursor if reader is None else reader.cursor()
+            query, bound = _bind_keys(keys, _SQL_GET_MANY_CARRAY, _SQL_GET_MANY_JSON)
+            return decode_many(cursor.execute(query, (bound, self._current_time())))
+        finally:
+            self._release_reader(reader)
 
     def delete(self, key: str) -> None:
         """
@@ -143,33 +757,43 @@ class Client:
         Args:
             key: The key to delete.
         """
-        self.cursor.execute("DELETE FROM FlashDB WHERE key = ?", (key,))
+        if self._write_batch and self._buffer_write(key, None):
+            return
+        self._del_cursor.execute(_SQL_DEL, (key,))
+        self._invalidate((key,))
 
     def delete_many(self, keys: List[str]) -> None:
         """
-        Deletes multiple key-value pairs in batches to avoid SQL variable limit.
+        Deletes multiple key-value pairs in a single statement.
 
         Args:
             keys: List of keys to delete.
         """
-        batch_size = 1000
-        for i in range(0, len(keys), batch_size):
-            batch = keys[i:i + batch_size]
-            placeholders = ','.join('?' for _ in batch)
-            sql = f"DELETE FROM FlashDB WHERE key IN ({placeholders})"
-            self.cursor.execute(sql, batch)
+        self.flush_writes()
+        if not keys:
+            return
+        query, bound = _bind_keys(keys, _SQL_DEL_MANY_CARRAY, _SQL_DEL_MANY_JSON)
+        self._del_cursor.execute(query, (bound,))
+        self._invalidate(keys)
 
-    def rename(self, old_key: str, new_key: str) -> None:
+    def rename(self, old_key: str, new_key: str) -> bool:
         """
         Renames a key to a new key.
 
         Args:
             old_key: The current key name.
             new_key: The new key name.
+
+        Returns:
+            True if the key was renamed (old key exists), False otherwise.
         """
-        self.cursor.execute("UPDATE FlashDB SET key = ? WHERE key = ?", (new_key, old_key))
+        self.flush_writes()
+        self.cursor.execute(_SQL_RENAME, (new_key, old_key))
+        renamed = self.conn.changes() > 0
+        self._invalidate((old_key, new_key))
+        return renamed
 
-    def get_expire(self, key: str) -> Optional[str]:
+    def get_expire(self, key: str) -> Optional[int]:
         """
         Gets the expiration date of a key if it exists.
 
@@ -179,9 +803,9 @@ class Client:
         Returns:
             The expiration date as a Unix timestamp, or None if the key has no expiration.
         """
-        self.cursor.execute("SELECT expires_at FROM FlashDB WHERE key = ? LIMIT 1", (key,))
-        result = self.cursor.fetchone()
-        return result[0] if result else None
+        self.flush_writes()
+        rows = self._read_all(self._expire_cursor, _SQL_GET_EXPIRE, (key,))
+        return rows[0][0] if rows else None
 
     def set_expire(self, key: str, ttl: int) -> None:
         """
@@ -191,51 +815,92 @@ class Client:
             key: The key to set expiration for.
             ttl: Time-to-live in seconds from now.
         """
-        expires_at = self._current_time() + ttl
-        self.cursor.execute("UPDATE FlashDB SET expires_at = ? WHERE key = ?", (expires_at, key))
+        self.flush_writes()
+        expires_at = _expires_at(self._current_time(), ttl)
+        self._expire_cursor.execute(_SQL_SET_EXPIRE, (expires_at, key))
+        self._invalidate((key,))
 
     def keys(self, pattern: str = "%") -> List[str]:
         """
         Retrieves all keys matching the given pattern.
 
         Args:
-            pattern: SQL LIKE pattern to match keys. The "_" character matches any single character.
+            pattern: Case-sensitive SQL LIKE pattern to match keys. The "_" character matches any single character.
                     Defaults to '%' which matches all keys.
 
         Returns:
             A list of keys matching the pattern.
         """
-        self.cursor.execute("SELECT key FROM FlashDB WHERE key LIKE ?", (pattern,))
-        return [row[0] for row in self.cursor.fetchall()]
+        self.flush_writes()
+        return self._read_keys(_SQL_KEYS, (*_like_bounds(pattern), pattern))
+
+    def iter_keys(self, pattern: str = "%") -> Iterator[str]:
+        """
+        Lazily iterates over all keys matching the given pattern.
+
+        The iterator owns its own cursor, and keeps its reader checked out until it is exhausted
+        or closed, so it can be consumed gradually or abandoned early while other operations run
+        on the client.
+
+        Args:
+            pattern: Case-sensitive SQL LIKE pattern to match keys. The "_" character matches any single character.
+                    Defaults to '%' which matches all keys.
+
+        Returns:
+            An iterator over the keys matching the pattern.
+        """
+        self.flush_writes()
+        reader = self._acquire_reader()
+        try:
+            cursor = (self.conn if reader is None else reader).cursor()
+            for row in cursor.execute(_SQL_KEYS, (*_like_bounds(pattern), pattern)):
+                yield row[0]
+        finally:
+            self._release_reader(reader)
 
-    def paginate(self, pattern: str = "%", page: int = 1, page_size: int = 10) -> List[str]:
+    def paginate(self, pattern: str = "%", after: Optional[str] = None, page_size: int = 10,
+                 page: Optional[int] = None) -> Union[Tuple[List[str], Optional[str]], List[str]]:
         """
-        Retrieves a paginated list of keys matching the pattern.
+        Retrieves a page of keys matching the pattern, in key order.
+
+        Pages are addressed by the last key of the previous page rather than by an offset,
+        so every page costs the same regardless of how deep into the keyspace it is.
 
         Args:
-            pattern: SQL LIKE pattern to match keys. The "_" character matches any single character.
+            pattern: Case-sensitive SQL LIKE pattern to match keys. The "_" character matches any single character.
                     Defaults to '%'.
-            page: Page number (1-based).
+            after: The cursor returned with the previous page. Omit to start from the first key.
             page_size: Number of keys per page.
+            page: Deprecated. 1-based page number, as accepted by earlier releases (an integer passed
+                    positionally as `after` is treated the same way). SQLite has to walk past every
+                    earlier page, so this costs O(page * page_size).
 
         Returns:
-            A list of keys for the specified page.
+            A tuple of the keys for this page and the cursor to pass as `after` for the next page,
+            or None as the cursor when there are no keys left. With `page`, just the list of keys.
         """
-        offset = (page - 1) * page_size
-        self.cursor.execute("""
-            SELECT key FROM FlashDB WHERE key LIKE ? LIMIT ? OFFSET ?
-        """, (pattern, page_size, offset))
-        return [row[0] for row in self.cursor.fetchall()]
+        self.flush_writes()
+        lower, upper = _like_bounds(pattern)
+        if page is not None or isinstance(after, int):
+            warnings.warn("paginate(page=...) is deprecated; pass the cursor from the previous page as 'after'",
+                          DeprecationWarning, stacklevel=2)
+            page = page if page is not None else after
+            return self._read_keys(_SQL_PAGE_OFFSET, (lower, upper, pattern, page_size, (page - 1) * page_size))
+        if after is None:
+            keys = self._read_keys(_SQL_PAGE_FIRST, (lower, upper, pattern, page_size))
+        else:
+            keys = self._read_keys(_SQL_PAGE_AFTER, (after, upper, pattern, page_size))
+        return keys, (keys[-1] if keys else None)
 
     def count(self) -> int:
         """
-        Counts the total number of keys in the database.
+        Counts the total number of keys in the database, including expired keys not yet cleaned up.
 
         Returns:
             The total number of keys.
         """
-        self.cursor.execute("SELECT COUNT(*) FROM FlashDB")
-        return self.cursor.fetchone()[0]
+        self.flush_writes()
+        return self._read_all(self.cursor, _SQL_COUNT)[0][0]
 
     def count_expired(self) -> int:
         """
@@ -244,30 +909,97 @@ class Client:
         Returns:
             The number of expired keys.
         """
-        now = self._current_time()
-        self.cursor.execute("SELECT COUNT(*) FROM FlashDB WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
-        return self.cursor.fetchone()[0]
+        self.flush_writes()
+        return self._read_all(self.cursor, _SQL_COUNT_EXPIRED, (self._current_time(),))[0][0]
 
     def cleanup(self) -> None:
         """
         Removes expired key-value pairs from the database.
 
-        This method is called automatically before any retrieval or key-checking operation to keep the database clean.
+        Reads already hide expired keys, so this only reclaims space. It runs automatically
+        from the write path at most once per `cleanup_interval` seconds.
         """
+        self.flush_writes()
         now = self._current_time()
-        self.cursor.execute("DELETE FROM FlashDB WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self.cursor.execute(_SQL_CLEANUP, (now,))
+        self._last_cleanup = now
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Groups several operations into a single transaction, committing once on exit.
+
+        The transaction is rolled back if the block raises. Transactions may be nested.
+        """
+        self.flush_writes()
+        with self.conn:
+            yield
+
+    def analyze(self) -> None:
+        """
+        Refreshes the statistics the query planner uses to pick indexes.
+
+        Statistics are sampled, so this stays cheap on large databases. It runs automatically
+        after large `set_many` batches, and `PRAGMA optimize` keeps them current on open and close.
+        """
+        self.flush_writes()
+        self.conn.execute("ANALYZE")
 
-    def vacuum(self) -> None:
+    def vacuum(self, pages: int = 1000) -> None:
         """
-        Optimizes the database file by reducing its size using the VACUUM command.
+        Returns up to `pages` free pages to the filesystem using incremental vacuum.
+
+        Unlike a full VACUUM this does not rewrite the database, so it is cheap enough to call regularly.
+
+        Args:
+            pages: Maximum number of free pages to release.
         """
+        self.flush_writes()
+        # The pragma frees one page per step, so it has to be stepped to completion
+        self.conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+
+    def compact(self) -> None:
+        """
+        Rebuilds the whole database file with the VACUUM command, defragmenting it and reducing its size.
+        """
+        self.flush_writes()
         self.conn.execute("VACUUM")
 
     def flush(self) -> None:
         """
-        Ensures all changes are written to disk by performing a full checkpoint of the WAL (Write-Ahead Log).
+        Copies committed changes from the WAL (Write-Ahead Log) into the database file.
+
+        Uses a PASSIVE checkpoint, which never waits on other readers or writers; anything it
+        cannot copy yet, including while a read on this connection is still open, stays safely in
+        the WAL for the next checkpoint.
         """
-        self.conn.execute("PRAGMA wal_checkpoint(FULL)")
+        self.flush_writes()
+        if _is_private(self._db_path):
+            return
+        try:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        except (apsw.BusyError, apsw.LockedError):
+            pass
+
+    def checkpoint_truncate(self) -> None:
+        """
+        Checkpoints the entire WAL and truncates the WAL file to zero bytes.
+
+        This waits for concurrent readers and writers, so reserve it for shutdown or maintenance.
+        """
+        self.flush_writes()
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def flush_writes(self) -> None:
+        """
+        Writes any buffered `set` and `delete` calls to the database in one transaction.
+
+        Every other operation flushes first, so this is only needed to make buffered writes
+        visible to other processes, or durable, without waiting for the next operation. Blocks
+        until a commit already running on the background writer has finished.
+        """
+        with self._flush_lock:
+            self._write_pending(self.conn)
 
     def execute(self, query: str, params: Tuple = ()) -> Any:
         """
@@ -280,14 +1012,42 @@ class Client:
         Returns:
             The result of the query.
         """
+        self.flush_writes()
         self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        rows = self.cursor.fetchall()
+        self._clear_cache()
+        return rows
 
     def close(self) -> None:
         """
-        Closes the database connection.
+        Closes the database connection after refreshing stale planner statistics and
+        checkpointing and truncating the WAL. Closing an already closed client does nothing.
+
+        The checkpoint waits at most `CLOSE_CHECKPOINT_TIMEOUT` milliseconds for other connections,
+        then copies what it can without them; the rest stays in the WAL for the next checkpoint.
         """
-        self.conn.close()
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake_writer.set()
+        if self._checkpointer is not None:
+            self._checkpointer.join()
+        if self._writer is not None:
+            self._writer.join()
+        try:
+            for reader in self._readers:
+                reader.close()
+            self.flush_writes()
+            self.conn.execute("PRAGMA optimize")
+            if not _is_private(self._db_path):
+                self.conn.execute(f"PRAGMA busy_timeout={self.CLOSE_CHECKPOINT_TIMEOUT}")
+                try:
+                    self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                except (apsw.BusyError, apsw.LockedError):
+                    pass  # A read still open on this connection; the WAL is checkpointed on a later open
+        finally:
+            self._pending = {}  # anything the final flush could not write is dropped, not retried forever
+            self.conn.close()
     
     def exists(self, key: str) -> bool:
         """
@@ -299,9 +1059,14 @@ class Client:
         Returns:
             True if the key exists and is not expired, False otherwise.
         """
-        self.cursor.execute("SELECT EXISTS(SELECT 1 FROM FlashDB WHERE key = ? AND (expires_at IS NULL OR expires_at > ?))", 
-                            (key, self._current_time()))
-        return self.cursor.fetchone()[0] == 1
+        now = self._current_time()
+        if self._pending or self._inflight:
+            entry = self._buffered_entry(key)
+            if entry is not _MISSING:
+                return entry is not None and (entry[1] is None or entry[1] > now)
+        if self._cache_size and self._cache_lookup(key, now) is not None:
+            return True
+        return self._read_all(self._exists_cursor, _SQL_EXISTS, (key, now))[0][0] == 1
     
     def pop(self, key: str) -> Optional[Any]:
         """
@@ -313,10 +1078,15 @@ class Client:
         Returns:
             The value associated with the key, or None if the key does not exist or has expired.
         """
-        value = self.get(key)
-        if value:
-            self.delete(key)
-        return value
+        self.flush_writes()
+        if _HAS_RETURNING:
+            rows = self._del_cursor.execute(_SQL_POP, (key, self._current_time())).fetchall()
+        else:
+            with self.conn:
+                rows = self._del_cursor.execute(_SQL_GET, (key, self._current_time())).fetchall()
+                self._del_cursor.execute(_SQL_DEL, (key,))
+        self._invalidate((key,))
+        return decode_value(rows[0][0]) if rows else None
     
     def update(self, key: str, value: Any) -> bool:
         """
@@ -329,9 +1099,71 @@ class Client:
         Returns:
             True if the update was successful (key exists), False otherwise.
         """
-        self.cursor.execute("SELECT EXISTS(SELECT 1 FROM FlashDB WHERE key = ?)", (key,))
-        if self.cursor.fetchone()[0] == 1:
-            self.cursor.execute("UPDATE FlashDB SET value = ? WHERE key = ?", (encode_value(value), key))
-            return True
-        return False
-    
+        self.flush_writes()
+        self._set_cursor.execute(_SQL_UPDATE, (encode_value(value), key))
+        updated = self.conn.changes() > 0
+        self._invalidate((key,))
+        return updated
+
+    def set_and_get_prev(self, key: str, value: Any, ttl: Optional[int] = None) -> Optional[Any]:
+        """
+        Sets a key-value pair and returns the value it replaced, atomically.
+
+        SQLite's RETURNING only reports the new row, so the previous value is read by a
+        separate statement in the same transaction.
+
+        Args:
+            key: The key to store.
+            value: The value to store, which should be serializable.
+            ttl: Time-to-live in seconds. If not provided, the key never expires.
+
+        Returns:
+            The previous value, or None if the key did not exist or had expired.
+        """
+        self.flush_writes()
+        now = self._current_time()
+        expires_at = _expires_at(now, ttl) if ttl else None
+        with self.conn:
+            rows = self._set_cursor.execute(_SQL_GET, (key, now)).fetchall()
+            self._set_cursor.execute(_SQL_SET, (key, encode_value(value), expires_at))
+        self._invalidate((key,))
+        return decode_value(rows[0][0]) if rows else None
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        """
+        Atomically adds to an integer value, in a single statement for natively stored integers.
+
+        A missing or expired key starts from `amount` and does not expire. Otherwise the
+        key keeps its expiration. Integers written by older versions, which are stored as
+        msgpack, are decoded and rewritten natively on their first increment.
+
+        Args:
+            key: The key to increment.
+            amount: The amount to add. Use a negative amount to decrement.
+
+        Returns:
+            The new value.
+
+        Raises:
+            TypeError: If the key holds a value that is not an integer.
+            OverflowError: If the new value does not fit in a signed 64-bit integer.
+        """
+        self.flush_writes()
+        amount = int(amount)
+        now = self._current_time()
+        try:
+            with self.conn:
+                rows = self._set_cursor.execute(_SQL_INCR, (key, amount, now)).fetchall()
+                if rows:
+                    return rows[0][0]
+                # Either the sum overflows or the value is not a native integer
+                value = decode_value(self._set_cursor.execute(_SQL_GET, (key, now)).fetchall()[0][0])
+                if type(value) is not int:
+                    raise TypeError(f"Value of key {key!r} is not an integer")
+                value += amount
+                if not _INT64_MIN <= value <= _INT64_MAX:
+                    raise OverflowError(f"Incrementing key {key!r} overflows a 64-bit integer")
+                self._set_cursor.execute(_SQL_UPDATE, (value, key))
+                return value
+        finally:
+            self._invalidate((key,))
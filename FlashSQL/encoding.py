@@ -1,8 +1,46 @@
-import msgpack
-from typing import Any, Union
+from typing import Any, Dict, Iterable, Tuple, Union
 
-def encode_value(value: Any) -> bytes:
-    return (b'\x01' + value) if isinstance(value, bytes) else (b'\x02' + msgpack.packb(value))
+# msgspec's reusable Encoder/Decoder are several times faster than msgpack-python. Values both
+# can encode produce identical bytes, so existing databases read back unchanged with either codec.
+# msgspec also accepts types msgpack-python rejects (set, UUID, Decimal, datetime, dataclasses);
+# most become plain lists, strings or maps, but timezone-aware datetimes use the timestamp
+# extension, which msgpack-python reads back as msgpack.Timestamp.
+try:
+    from msgspec import msgpack as _msgspec
+    _pack = _msgspec.Encoder().encode
+    _unpack = _msgspec.Decoder().decode
+except ImportError:
+    import msgpack
+    _pack = msgpack.packb
+    _unpack = msgpack.unpackb  # msgpack>=1.0 decodes str as text (raw=False) by default
 
-def decode_value(buffer: bytes) -> Union[Any, None]:
-    return buffer[1:] if buffer[0:1] == b'\x01' else msgpack.unpackb(buffer[1:], raw=False) if buffer[0:1] == b'\x02' else None
+_PASSTHROUGH = (str, int, float, type(None))  # Stored natively as TEXT/INTEGER/REAL/NULL; bool is excluded on purpose
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+_ZERO_COPY_MIN = 1 << 16  # msgpack payloads at least this large are unpacked through a memoryview instead of a sliced copy
+
+def encode_value(value: Any) -> Union[bytes, str, int, float, None]:
+    kind = type(value)
+    # SQLite stores a NaN REAL as NULL, so NaN goes through msgpack like ints too wide for INTEGER
+    if kind in _PASSTHROUGH and (kind is not int or _INT64_MIN <= value <= _INT64_MAX) and (kind is not float or value == value):
+        return value
+    return (b'\x01' + value) if isinstance(value, bytes) else (b'\x02' + _pack(value))
+
+def decode_value(buffer: Union[bytes, str, int, float, None]) -> Union[Any, None]:
+    if type(buffer) is not bytes:
+        return buffer
+    tag = buffer[0] if buffer else 0
+    if tag == 2:
+        return _unpack(buffer[1:] if len(buffer) < _ZERO_COPY_MIN else memoryview(buffer)[1:])
+    return buffer[1:] if tag == 1 else None
+
+def decode_many(rows: Iterable[Tuple[str, Union[bytes, str, int, float, None]]]) -> Dict[str, Any]:
+    # Same rules as decode_value, inlined so bulk reads skip a Python call per row
+    unpack = _unpack
+    return {
+        key: buffer if type(buffer) is not bytes
+        else None if not buffer
+        else buffer[1:] if buffer[0] == 1
+        else unpack(buffer[1:] if len(buffer) < _ZERO_COPY_MIN else memoryview(buffer)[1:]) if buffer[0] == 2
+        else None
+        for key, buffer in rows
+    }
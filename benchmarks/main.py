@@ -1,3 +1,4 @@
+import os
 import time
 from typing import Callable, List, Tuple, Any
 from FlashSQL import Client
@@ -7,6 +8,8 @@ QUERY_COUNT = 100000  # Number of queries to benchmark
 KEY_LENGTH = 10       # Length of the key
 VALUE_LENGTH = 50     # Length of the value
 
+_ALPHA_TABLE = bytes(65 + i % 26 for i in range(256))  # Maps any byte to an uppercase ASCII letter
+
 class BenchmarkResult:
     def __init__(self, operation: str, total_time: float, avg_latency: float, ops_per_second: float) -> None:
         self.operation = operation
@@ -14,14 +17,18 @@ class BenchmarkResult:
         self.avg_latency = avg_latency
         self.ops_per_second = ops_per_second
 
+def set_in_transaction(db: Client, data: List[Tuple[str, str]]) -> None:
+    with db.transaction():
+        for key, value in data:
+            db.set(key, value)
+
 class Benchmark:
     def __init__(self, db: Client) -> None:
         self.db = db
 
-    def random_string(self, length: int) -> str:
-        import random
-        import string
-        return ''.join(random.choices(string.ascii_uppercase, k=length))
+    def random_strings(self, count: int, length: int) -> List[str]:
+        data = os.urandom(count * length).translate(_ALPHA_TABLE).decode('ascii')
+        return [data[i:i + length] for i in range(0, count * length, length)]
 
     def format_time(self, seconds: float) -> str:
         return f"{seconds:.2f}"
@@ -40,8 +47,8 @@ class Benchmark:
         return BenchmarkResult(name, duration, average_latency, operations_per_second)
 
     def prepare_data(self) -> Tuple[List[str], List[str], List[Tuple[str, str]]]:
-        keys = [self.random_string(KEY_LENGTH) for _ in range(QUERY_COUNT)]
-        values = [self.random_string(VALUE_LENGTH) for _ in range(QUERY_COUNT)]
+        keys = self.random_strings(QUERY_COUNT, KEY_LENGTH)
+        values = self.random_strings(QUERY_COUNT, VALUE_LENGTH)
         key_value_pairs = list(zip(keys, values))
         return keys, values, key_value_pairs
 
@@ -51,6 +58,7 @@ class Benchmark:
         benchmarks = [
             ("Set", lambda db, data: [db.set(key, value) for key, value in data], key_value_pairs),
             ("Set Many", lambda db, data: db.set_many({key: (value, None) for key, value in data}), key_value_pairs),
+            ("Set (Transaction)", set_in_transaction, key_value_pairs),
             ("Exists", lambda db, data: [db.exists(key) for key in data], keys),
             ("Get Expire", lambda db, data: [db.get_expire(key) for key in data], keys),
             ("Set Expire", lambda db, data: [db.set_expire(key, 31536000) for key in data], keys),
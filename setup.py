@@ -12,7 +12,11 @@ setup(
     packages=find_packages(),
     install_requires=[
         'apsw',  
+        'msgpack>=1.0',
     ],
+    extras_require={
+        'fast': ['msgspec'],
+    },
     python_requires='>=3.6',  
     classifiers=[
         'Development Status :: 3 - Alpha',